@@ -23,17 +23,17 @@ from reportlab.lib.units import mm
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+from ledger import ensure_index, get_ledger
+from refdata import RefData
+
 
 API_KEY = "DVzlum5eSDKjelf2"
-code_file = "code.txt"
 
-indicator_names = {}
-with open(code_file, encoding="utf-8") as f:
-    for line in f:
-        parts = line.strip().split("\t")
-        if len(parts) == 2:
-            code, name = parts
-            indicator_names[code] = name
+refdata = RefData()
+indicator_names = refdata.view("indicator_names")
+RATIO_FORMULAS = refdata.view("ratio_formulas")
+
+LEDGER_PAGE_SIZE = 50
 
 app = dash.Dash(
     __name__,
@@ -113,29 +113,96 @@ app.layout = dbc.Container([
         ),
     ], className="mt-3"),
 
-    html.Div(id="selected-inn", className="mt-3 text-center fw-bold")
+    html.Div(id="selected-inn", className="mt-3 text-center fw-bold"),
+
+    html.H3("Поиск по журналу транзакций", className="text-center mt-4 mb-3"),
+
+    dcc.Store(id="ledger-init"),
+    dcc.Store(id="ledger-query"),
+
+    dbc.Row([
+        dbc.Col(
+            dcc.DatePickerRange(
+                id="ledger-dates",
+                display_format="DD.MM.YYYY",
+                start_date_placeholder_text="С",
+                end_date_placeholder_text="По",
+                clearable=True
+            ),
+            xs=12, md="auto"
+        ),
+        dbc.Col(
+            dbc.Input(id="ledger-client", type="text", placeholder="ID клиента (через запятую)"),
+            xs=12, md=3
+        ),
+        dbc.Col(
+            dcc.Dropdown(
+                id="ledger-type",
+                options=[],
+                multi=True,
+                placeholder="Тип транзакции"
+            ),
+            xs=12, md=3
+        ),
+    ], className="mb-2 g-2"),
+
+    dbc.Row([
+        dbc.Col(
+            dcc.Dropdown(
+                id="ledger-client-country",
+                options=[],
+                multi=True,
+                placeholder="Страна клиента"
+            ),
+            xs=12, md=4
+        ),
+        dbc.Col(
+            dcc.Dropdown(
+                id="ledger-counterparty-country",
+                options=[],
+                multi=True,
+                placeholder="Страна контрагента"
+            ),
+            xs=12, md=4
+        ),
+    ], className="mb-2 g-2"),
+
+    dbc.Row([
+        dbc.Col(
+            dbc.Checklist(
+                id="ledger-flags",
+                options=[],
+                value=[],
+                inline=True
+            ),
+            xs=12, md=True
+        ),
+        dbc.Col(
+            dbc.Button("Найти", id="ledger-search", n_clicks=0, color="primary"),
+            xs=12, md="auto"
+        ),
+    ], className="mb-2 g-2", align="center"),
+
+    html.Div(id="ledger-summary", className="mb-2"),
+
+    dash_table.DataTable(
+        id="ledger-table",
+        columns=[],
+        data=[],
+        page_action="custom",
+        page_current=0,
+        page_size=LEDGER_PAGE_SIZE,
+        page_count=0,
+        style_table={"overflowX": "auto", "minWidth": "100%"},
+        style_cell={
+            "textAlign": "center",
+            "padding": "6px",
+            "fontFamily": "Arial, sans-serif",
+            "fontSize": "13px",
+        },
+        style_header={"backgroundColor": "#e1e1e1", "fontWeight": "bold"}
+    )
 ], fluid=True, className="px-2 px-md-4")
-RATIO_FORMULAS = {
-    "Коэффициент финансовой устойчивости":"Доля стабильных источников финансирования активов \n(1300 + 1400) / 1700",
-    "Коэффициент автономии":"Степень независимости компании от заемного капитала \n1300 / 1600",
-    "Коэффициент обеспеченности собственными средствами":"Степень покрытия оборотных активов собственными ресурсами \n(1300 - 1100) / 1200",
-    "Отношение дебиторской задолженности к активам":"Доля средств, отвлеченных в расчеты \n1230 / 1600",
-    "Коэффициент соотношения заемного и собственного капитала":"Степень финансовой зависимости предприятия \n(1410 + 1510) / 1300",
-    "Коэффициент абсолютной ликвидности":"Степень способности погашать краткосрочные обязательства \n(1250 + 1240) / 1500",
-    "Коэффициент текущей ликвидности":"Степень достаточности оборотных активов для расчетов \n1200 / 1500",
-    "Коэффициент обеспеченности обязательств активами":"Степень покрытия долгов стоимостью имущества \n(1600 - 1220) / (1520 + 1510 + 1550 + 1400)",
-    "Степень платежеспособности по текущим обязательствам":"Степень погашения краткосрочной задолженности компанией \n(1510 + 1520 + 1550) / (2110 / 12)",
-    "Коэффициент утраты платежеспособности":"Коэффициент риска ухудшения расчетной дисциплины предприятия \n(КТЛк + 3 х (КТЛк - КТЛн)) / 2",
-    "Рентабельность продаж, %":"Доля прибыли в выручке \n(2110 - 2120 - 2210 - 2220) / 2110",
-    "Рентабельность затрат, %":"Процент эффективности понесенных производственных расходов \n(2110 - 2120 - 2210 - 2220) / (2120 + 2210 + 2220)",
-    "Рентабельность активов, %":"Процент доходности использования всего имущества \n2400 / ((1600н + 1600к) / 2)",
-    "Рентабельность собственного капитала, %":"Процент прибыльности вложений собственников компании \n2400 / ((1300н + 1300к) / 2)",
-    "Оборачиваемость дебиторской задолженности":"Отражение скорости возврата средств от покупателей \n2110 / ((1230н + 1230к) / 2)",
-    "Оборачиваемость кредиторской задолженности":"Коэффициент интенсивности погашения обязательств перед поставщиками \n2120 / ((1520н + 1520к) / 2)",
-    "Коэффициент финансового рычага":"Степень влияния заемных средств на доходность \n(1400 + 1500) / 1300",
-    "Тип финансовой устойчивости":"Определяет общее состояние структуры капитала предприятия \nСравнение запасов с источниками формирования"
-
-}
 
 
 @app.callback(
@@ -679,5 +746,92 @@ def download_company_pdf(n_clicks, report):
     return dcc.send_bytes(pdf_bytes, filename)
 
 
+@app.callback(
+    Output("ledger-type", "options"),
+    Output("ledger-client-country", "options"),
+    Output("ledger-counterparty-country", "options"),
+    Output("ledger-flags", "options"),
+    Output("ledger-table", "columns"),
+    Input("ledger-init", "data")
+)
+def init_ledger_filters(_data):
+    try:
+        ledger = get_ledger()
+    except FileNotFoundError:
+        return [], [], [], [], []
+    flag_options = [{"label": "Любой флаг", "value": "any"}] + [
+        {"label": c, "value": c} for c in ledger.flag_columns
+    ]
+    columns = [{"name": c, "id": c} for c in ledger.columns]
+    return (
+        ledger.values("transaction_type"),
+        ledger.values("client_country"),
+        ledger.values("counterparty_country"),
+        flag_options,
+        columns,
+    )
+
+
+@app.callback(
+    Output("ledger-table", "data"),
+    Output("ledger-table", "page_count"),
+    Output("ledger-table", "page_current"),
+    Output("ledger-summary", "children"),
+    Output("ledger-query", "data"),
+    Input("ledger-table", "page_current"),
+    Input("ledger-search", "n_clicks"),
+    State("ledger-query", "data"),
+    State("ledger-table", "page_size"),
+    State("ledger-dates", "start_date"),
+    State("ledger-dates", "end_date"),
+    State("ledger-client", "value"),
+    State("ledger-type", "value"),
+    State("ledger-client-country", "value"),
+    State("ledger-counterparty-country", "value"),
+    State("ledger-flags", "value"),
+    prevent_initial_call=True
+)
+def search_ledger(page_current, n_clicks, query, page_size, start_date, end_date, client,
+                  tx_types, client_countries, counterparty_countries, flags):
+    if dash.callback_context.triggered_id == "ledger-search":
+        client_ids = None
+        if client:
+            try:
+                client_ids = [int(x) for x in client.replace(" ", "").split(",") if x]
+                if any(not -2**63 <= x < 2**63 for x in client_ids):
+                    raise ValueError(client)
+            except ValueError:
+                return [], 0, 0, dbc.Alert("ID клиента должен быть числом.", color="warning"), None
+
+        flags = flags or []
+        query = {
+            "start": start_date,
+            "end": end_date,
+            "transaction_type": tx_types,
+            "client_country": client_countries,
+            "counterparty_country": counterparty_countries,
+            "flags": [f for f in flags if f != "any"],
+            "any_flag": "any" in flags,
+            "client_id": client_ids,
+        }
+        page_current = 0
+    elif not query:
+        return no_update, no_update, no_update, no_update, no_update
+
+    try:
+        ledger = get_ledger()
+    except FileNotFoundError:
+        return [], 0, 0, dbc.Alert("Индекс журнала транзакций не построен.", color="warning"), None
+    rows = ledger.query(**query)
+
+    page_count = max(1, -(-len(rows) // page_size))
+    page_current = min(page_current or 0, page_count - 1)
+    page_df = ledger.page(rows, page_current, page_size)
+    summary = html.P(f"Найдено транзакций: {len(rows)}", className="fw-bold")
+
+    return page_df.to_dict("records"), page_count, page_current, summary, query
+
+
 if __name__ == '__main__':
+    ensure_index()
     app.run(debug=True)
@@ -0,0 +1,6 @@
+import ledger
+
+
+def on_starting(server):
+    # Build the ledger index once in the master, before any worker forks.
+    ledger.ensure_index()
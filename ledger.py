@@ -0,0 +1,264 @@
+import json
+import os
+import shutil
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, the dev server is a single process
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from refdata import source_stamp
+
+
+LEDGER_FILE = "transactions_with_fatf_ofac.csv"
+LEDGER_INDEX_DIR = "ledger_index"
+
+BITMAP_COLUMNS = ["transaction_type", "client_country", "counterparty_country"]
+
+CHECK_INTERVAL = 2.0
+
+
+def index_path(csv_path: str = LEDGER_FILE, index_root: str = LEDGER_INDEX_DIR):
+    """Index directory for the current version (size, mtime, inode) of the CSV."""
+    return os.path.join(index_root, "-".join(str(x) for x in source_stamp(csv_path)))
+
+
+def build_index(csv_path: str, out_dir: str):
+    """Sort the ledger by timestamp and save columns and bitmaps as .npy files.
+
+    Every cell is read as text with pandas' NA parsing off, so a country code
+    such as ``NA`` (Namibia) stays a value; numeric columns are converted
+    explicitly and a missing flag counts as unset. String columns are stored
+    as integer codes with their sorted values in ``meta.json``. Bitmaps are
+    one bit per row, packed 8 rows per byte, one 2-D array per indexed column
+    (a row per value) plus one for all flags. The index is written to a temporary directory and renamed into place, so
+    a concurrent builder never exposes a half-written index.
+    """
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    flag_columns = [c for c in df.columns if c.endswith("_flag")]
+
+    for col in df.columns:
+        if col == "timestamp":
+            df[col] = pd.to_datetime(df[col])
+        elif col in flag_columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).ne(0).astype(np.uint8)
+        elif col not in BITMAP_COLUMNS:
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except ValueError:
+                pass
+
+    # NaT is stored as the smallest int64, so it must sort first for searchsorted.
+    df = df.sort_values("timestamp", kind="stable", na_position="first").reset_index(drop=True)
+
+    categories = {}
+
+    tmp_dir = f"{out_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        for col in df.columns:
+            if col == "timestamp":
+                values = df[col].values.astype("datetime64[ns]").view("int64")
+            elif not pd.api.types.is_numeric_dtype(df[col]):
+                values, uniques = pd.factorize(df[col].astype(str), sort=True, use_na_sentinel=False)
+                categories[col] = [str(v) for v in uniques]
+                if col in BITMAP_COLUMNS:
+                    bitmaps = np.stack([np.packbits(values == i) for i in range(len(uniques))])
+                    np.save(os.path.join(tmp_dir, f"bitmap_{col}.npy"), bitmaps)
+            else:
+                values = df[col].values
+            np.save(os.path.join(tmp_dir, f"col_{col}.npy"), values)
+
+        flags = np.zeros((len(flag_columns), (len(df) + 7) // 8), dtype=np.uint8)
+        for i, col in enumerate(flag_columns):
+            flags[i] = np.packbits(df[col].values)
+        np.save(os.path.join(tmp_dir, "bitmap_flags.npy"), flags)
+
+        meta = {
+            "n_rows": len(df),
+            "columns": list(df.columns),
+            "categories": categories,
+            "flag_columns": flag_columns,
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        os.makedirs(os.path.dirname(out_dir) or ".", exist_ok=True)
+        os.rename(tmp_dir, out_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def ensure_index(csv_path: str = LEDGER_FILE, index_root: str = LEDGER_INDEX_DIR):
+    """Build the index for the current CSV unless it already exists.
+
+    Meant to run outside request handling (``python ledger.py`` or the
+    gunicorn ``on_starting`` hook). A lock file makes sure only one process
+    builds. Superseded index versions and temporary directories left by a
+    killed build are removed; workers still mapping an old version keep
+    their mappings until they switch to the new one.
+    """
+    index_dir = index_path(csv_path, index_root)
+    os.makedirs(index_root, exist_ok=True)
+    with open(os.path.join(index_root, ".lock"), "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(os.path.join(index_dir, "meta.json")):
+            build_index(csv_path, index_dir)
+        for name in os.listdir(index_root):
+            path = os.path.join(index_root, name)
+            if name != ".lock" and path != index_dir:
+                shutil.rmtree(path, ignore_errors=True)
+    return index_dir
+
+
+class Ledger:
+    """Timestamp-sorted transactions with packed bitmap indexes.
+
+    All arrays are opened with ``mmap_mode="r"``, so every worker shares the
+    same pages through the OS page cache. Time ranges resolve to a contiguous
+    row slice via binary search; attribute filters are bitmaps combined with
+    numpy bitwise operations on that slice only.
+    """
+
+    def __init__(self, index_dir: str):
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.n_rows = meta["n_rows"]
+        self.columns = meta["columns"]
+        self.categories = meta["categories"]
+        self.flag_columns = meta["flag_columns"]
+
+        self.arrays = {col: load(f"col_{col}") for col in self.columns}
+        self.timestamps = self.arrays["timestamp"]
+        self.client_ids = self.arrays["client_id"]
+
+        self.codes = {
+            col: {v: i for i, v in enumerate(self.categories[col])} for col in BITMAP_COLUMNS
+        }
+        self.bitmaps = {col: load(f"bitmap_{col}") for col in BITMAP_COLUMNS}
+        self.flag_bitmaps = load("bitmap_flags")
+
+    @classmethod
+    def from_csv(cls, path: str = LEDGER_FILE, index_root: str = LEDGER_INDEX_DIR):
+        """Open the prebuilt index for the current version of ``path``."""
+        index_dir = index_path(path, index_root)
+        if not os.path.exists(os.path.join(index_dir, "meta.json")):
+            raise FileNotFoundError(f"{index_dir}: ledger index not built, run `python ledger.py`")
+        return cls(index_dir)
+
+    def values(self, col: str):
+        return list(self.categories[col])
+
+    def time_range(self, start=None, end=None):
+        """Row slice [lo, hi) for start <= timestamp <= end (either bound optional)."""
+        lo, hi = 0, self.n_rows
+        if start is not None:
+            lo = int(np.searchsorted(self.timestamps, pd.Timestamp(start).value, side="left"))
+        if end is not None:
+            end_ts = pd.Timestamp(end)
+            if isinstance(end, str) and len(end) <= 10:
+                end_ts = end_ts + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+            hi = int(np.searchsorted(self.timestamps, end_ts.value, side="right"))
+        return lo, max(lo, hi)
+
+    def _any_of(self, col: str, values, b_lo: int, b_hi: int):
+        if isinstance(values, (str, int)):
+            values = [values]
+        acc = np.zeros(b_hi - b_lo, dtype=np.uint8)
+        for v in values:
+            i = self.codes[col].get(str(v))
+            if i is not None:
+                acc |= self.bitmaps[col][i, b_lo:b_hi]
+        return acc
+
+    def query(self, start=None, end=None, transaction_type=None, client_country=None,
+              counterparty_country=None, flags=None, any_flag=False, client_id=None):
+        """Row positions (in timestamp order) matching every given filter.
+
+        Attribute filters accept a single value or a list (matched with OR);
+        ``flags`` lists flag columns that must all be set, ``any_flag``
+        requires at least one flag column to be set.
+        """
+        lo, hi = self.time_range(start, end)
+        if lo >= hi:
+            return np.empty(0, dtype=np.int64)
+
+        b_lo, b_hi = lo // 8, (hi + 7) // 8
+        mask = np.full(b_hi - b_lo, 0xFF, dtype=np.uint8)
+
+        for col, values in (
+            ("transaction_type", transaction_type),
+            ("client_country", client_country),
+            ("counterparty_country", counterparty_country),
+        ):
+            if values:
+                mask &= self._any_of(col, values, b_lo, b_hi)
+
+        for col in flags or []:
+            mask &= self.flag_bitmaps[self.flag_columns.index(col), b_lo:b_hi]
+
+        if any_flag:
+            mask &= np.bitwise_or.reduce(self.flag_bitmaps[:, b_lo:b_hi], axis=0)
+
+        offset = b_lo * 8
+        bits = np.unpackbits(mask, count=min(len(mask) * 8, self.n_rows - offset))
+        rows = np.flatnonzero(bits[lo - offset:hi - offset]) + lo
+
+        if client_id is not None:
+            ids = np.atleast_1d(np.asarray(client_id, dtype=self.client_ids.dtype))
+            rows = rows[np.isin(self.client_ids[rows], ids)]
+
+        return rows
+
+    def page(self, rows, page: int, page_size: int):
+        chunk = rows[page * page_size:(page + 1) * page_size]
+        data = {}
+        for col in self.columns:
+            values = self.arrays[col][chunk]
+            if col == "timestamp":
+                values = pd.to_datetime(values).strftime("%Y-%m-%d %H:%M:%S")
+            elif col in self.categories:
+                values = np.asarray(self.categories[col], dtype=object)[values]
+            data[col] = values
+        return pd.DataFrame(data, columns=self.columns)
+
+
+_ledger = None
+_ledger_dir = None
+_checked_at = 0.0
+
+
+def get_ledger():
+    """Current ledger index, re-checked against the CSV every ``CHECK_INTERVAL``.
+
+    When the CSV changes and ``ensure_index`` has built the new version, the
+    worker switches to it; until then it keeps serving the index it has.
+    """
+    global _ledger, _ledger_dir, _checked_at
+    now = time.monotonic()
+    if _ledger is not None and now - _checked_at < CHECK_INTERVAL:
+        return _ledger
+    _checked_at = now
+
+    try:
+        index_dir = index_path(LEDGER_FILE)
+        if index_dir != _ledger_dir:
+            _ledger = Ledger.from_csv(LEDGER_FILE)
+            _ledger_dir = index_dir
+    except (OSError, ValueError):
+        if _ledger is None:
+            raise
+    return _ledger
+
+
+if __name__ == "__main__":
+    print(ensure_index())
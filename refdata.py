@@ -0,0 +1,236 @@
+import mmap
+import os
+import struct
+import time
+from collections.abc import Mapping
+
+
+REFDATA_FILE = "refdata.bin"
+
+REFDATA_SOURCES = {
+    "indicator_names": "code.txt",
+    "ratio_formulas": "ratio_formulas.txt",
+}
+
+MAGIC = b"CDDREF02"
+HEADER = struct.Struct("<8sII")  # magic, n_tables, n_sources
+SOURCE = struct.Struct("<IIQqQ")  # path_off, path_len, size, mtime_ns, inode
+TABLE = struct.Struct("<IIII")   # name_off, name_len, index_off, n_entries
+ENTRY = struct.Struct("<IIII")   # key_off, key_len, val_off, val_len
+
+CHECK_INTERVAL = 2.0
+
+
+def read_source(path: str):
+    """Tab-separated ``key\\tvalue`` lines; a literal ``\\n`` in a value is a line break."""
+    rows = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.strip().split("\t")
+            if len(parts) == 2:
+                key, value = parts
+                rows[key] = value.replace("\\n", "\n")
+    return rows
+
+
+def source_stamp(path: str):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def compile_refdata(sources: dict, out_path: str):
+    """Write every source table into one binary file with sorted key indexes.
+
+    Layout: header, source stamps (size, mtime, inode of each file as read),
+    table directory, per-table entry arrays sorted by UTF-8 key bytes, then
+    the string blob. The file is written next to ``out_path`` and moved into
+    place atomically, so processes that still map the old file keep reading
+    it undisturbed.
+    """
+    stamps = []
+    tables = []
+    for name, path in sorted(sources.items()):
+        stamps.append((path.encode("utf-8"), source_stamp(path)))
+        rows = sorted(
+            (k.encode("utf-8"), v.encode("utf-8")) for k, v in read_source(path).items()
+        )
+        tables.append((name.encode("utf-8"), rows))
+
+    table_start = HEADER.size + SOURCE.size * len(stamps)
+    index_start = table_start + TABLE.size * len(tables)
+    blob_start = index_start + ENTRY.size * sum(len(rows) for _, rows in tables)
+
+    blob = bytearray()
+
+    def put(b: bytes):
+        off = blob_start + len(blob)
+        blob.extend(b)
+        return off, len(b)
+
+    source_dir = bytearray()
+    for path, stamp in stamps:
+        source_dir += SOURCE.pack(*put(path), *stamp)
+
+    directory = bytearray()
+    entries = bytearray()
+    for name, rows in tables:
+        name_off, name_len = put(name)
+        directory += TABLE.pack(name_off, name_len, index_start + len(entries), len(rows))
+        for key, value in rows:
+            entries += ENTRY.pack(*put(key), *put(value))
+
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(tables), len(stamps)))
+            f.write(source_dir)
+            f.write(directory)
+            f.write(entries)
+            f.write(blob)
+        os.replace(tmp_path, out_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class RefTable(Mapping):
+    """Read-only string table backed by a memory-mapped compiled file."""
+
+    def __init__(self, mm: mmap.mmap, index_off: int, n_entries: int):
+        self._mm = mm
+        self._index_off = index_off
+        self._n = n_entries
+
+    def _entry(self, i: int):
+        return ENTRY.unpack_from(self._mm, self._index_off + i * ENTRY.size)
+
+    def _key(self, i: int):
+        key_off, key_len, _, _ = self._entry(i)
+        return self._mm[key_off:key_off + key_len]
+
+    def __getitem__(self, key):
+        target = str(key).encode("utf-8")
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n:
+            key_off, key_len, val_off, val_len = self._entry(lo)
+            if self._mm[key_off:key_off + key_len] == target:
+                return self._mm[val_off:val_off + val_len].decode("utf-8")
+        raise KeyError(key)
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield self._key(i).decode("utf-8")
+
+    def __len__(self):
+        return self._n
+
+
+class RefData:
+    """Compiled reference tables shared by all worker processes.
+
+    The compiled file is mapped read-only, so its pages live once in the OS
+    page cache regardless of the number of workers. Every ``CHECK_INTERVAL``
+    seconds each source's size, mtime and inode are compared with the stamps
+    recorded in the compiled file; any difference triggers a recompile, and a
+    compiled file replaced by another worker is remapped. Once tables are
+    loaded, errors during a check (a missing source, a read-only directory)
+    keep the last mapped tables in service and the check is retried later.
+    """
+
+    def __init__(self, sources: dict = None, path: str = REFDATA_FILE):
+        self.sources = dict(REFDATA_SOURCES if sources is None else sources)
+        self.path = path
+        self._tables = {}
+        self._source_stamps = None
+        self._stamp = None
+        self._checked_at = 0.0
+
+    def _file_changed(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (st.st_ino, st.st_mtime_ns) != self._stamp
+
+    def _stale(self):
+        if self._source_stamps is None or set(self._source_stamps) != set(self.sources.values()):
+            return True
+        return any(source_stamp(p) != self._source_stamps[p] for p in self.sources.values())
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, n_tables, n_sources = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: not a compiled reference data file")
+
+        source_stamps = {}
+        for i in range(n_sources):
+            path_off, path_len, *stamp = SOURCE.unpack_from(mm, HEADER.size + i * SOURCE.size)
+            source_stamps[mm[path_off:path_off + path_len].decode("utf-8")] = tuple(stamp)
+
+        table_start = HEADER.size + n_sources * SOURCE.size
+        tables = {}
+        for i in range(n_tables):
+            name_off, name_len, index_off, n_entries = TABLE.unpack_from(
+                mm, table_start + i * TABLE.size
+            )
+            name = mm[name_off:name_off + name_len].decode("utf-8")
+            tables[name] = RefTable(mm, index_off, n_entries)
+
+        self._tables = tables
+        self._source_stamps = source_stamps
+        self._stamp = (st.st_ino, st.st_mtime_ns)
+
+    def refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and self._stamp is not None and now - self._checked_at < CHECK_INTERVAL:
+            return
+        self._checked_at = now
+
+        try:
+            if self._file_changed():
+                try:
+                    self._load()
+                except (ValueError, struct.error):
+                    # Unreadable or older format: force a recompile below.
+                    self._source_stamps = None
+            if self._stale():
+                compile_refdata(self.sources, self.path)
+                self._load()
+        except (OSError, ValueError, struct.error):
+            if not self._tables:
+                raise
+
+    def table(self, name: str):
+        self.refresh()
+        return self._tables[name]
+
+    def view(self, name: str):
+        return RefView(self, name)
+
+
+class RefView(Mapping):
+    """Mapping that always resolves to the current version of a table."""
+
+    def __init__(self, store: RefData, name: str):
+        self._store = store
+        self._name = name
+
+    def __getitem__(self, key):
+        return self._store.table(self._name)[key]
+
+    def __iter__(self):
+        return iter(self._store.table(self._name))
+
+    def __len__(self):
+        return len(self._store.table(self._name))